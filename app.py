@@ -1,13 +1,31 @@
 import streamlit as st
+import copy
+import functools
+import io
 import os
 import hashlib
+import queue
+import threading
 import chromadb
+import numpy as np
 import pandas as pd
 import google.generativeai as genai
+import torch
 
-from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+import pypdfium2 as pdfium
 from docx import Document
 from bs4 import BeautifulSoup
+# Parser HTML en C (Modest); ~10-20x más rápido que html.parser puro Python
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+# Batching dinámico de peticiones concurrentes al modelo de embeddings
+try:
+    import batched
+except ImportError:
+    batched = None
 import csv
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
@@ -22,11 +40,47 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # Inicialización del modelo de embeddings (convierte texto a vectores numéricos)
-# 'all-MiniLM-L6-v2' es ligero y eficiente para ejecución local
-EMBEDDING_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Inicialización de la base de datos vectorial ChromaDB
-client = chromadb.Client()
+# 'all-MiniLM-L6-v2' es ligero y eficiente para ejecución local.
+# st.cache_resource garantiza una sola instancia por proceso, incluso
+# tras hot-reloads de Streamlit (evita recargar los pesos en cada edición).
+# Si hay GPU disponible movemos el modelo a CUDA y usamos fp16:
+# el encode pasa de decenas a miles de frases por segundo.
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# En GPU conviene un lote mayor para saturar el dispositivo
+ENCODE_BATCH_SIZE = 128 if DEVICE == "cuda" else 64
+
+@st.cache_resource
+def get_embedder():
+    if DEVICE == "cpu":
+        # En CPU usamos el backend ONNX Runtime con pesos cuantizados a
+        # int8 (publicados en el propio repo del modelo): 2-4x más rápido
+        # que PyTorch con pérdida de calidad despreciable. Si falla
+        # (optimum/onnxruntime sin instalar, etc.) caemos al backend
+        # PyTorch normal, pero avisando: un fallback silencioso dejaría
+        # una instalación mal configurada pasando por optimizada.
+        try:
+            return SentenceTransformer(
+                "all-MiniLM-L6-v2",
+                backend="onnx",
+                model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx"},
+                device="cpu",
+            )
+        except Exception as exc:
+            st.warning(f"Backend ONNX no disponible ({exc}); usando PyTorch en CPU.")
+    model = SentenceTransformer("all-MiniLM-L6-v2", device=DEVICE)
+    if DEVICE == "cuda":
+        model.half()
+    return model
+
+# Inicialización de la base de datos vectorial ChromaDB.
+# PersistentClient guarda el índice en disco, así el trabajo de indexado
+# sobrevive a reinicios del proceso en lugar de rehacerse cada vez.
+@st.cache_resource
+def get_chroma():
+    return chromadb.PersistentClient(path=".chroma_cache")
+
+EMBEDDING_MODEL = get_embedder()
+client = get_chroma()
 
 # ============================================================
 # FUNCIONES DE EXTRACCIÓN Y PROCESAMIENTO
@@ -36,27 +90,82 @@ def hash_file(file) -> str:
     """
     Genera una huella digital (hash) única para el archivo.
     Sirve para detectar si el usuario subió un archivo nuevo o el mismo.
+    Se hashea en streaming (file_digest) para no duplicar el archivo
+    completo en memoria con getvalue().
+    """
+    file.seek(0)
+    if hasattr(hashlib, "file_digest"):
+        digest = hashlib.file_digest(file, "sha256").hexdigest()
+    else:
+        # Python 3.10 (la versión documentada) no tiene file_digest:
+        # mismo streaming a mano, en bloques de 1 MiB
+        sha = hashlib.sha256()
+        while block := file.read(1024 * 1024):
+            sha.update(block)
+        digest = sha.hexdigest()
+    file.seek(0)
+    return digest
+
+# A partir de cuántas páginas compensa pagar el arranque del pool de procesos
+PDF_PARALLEL_THRESHOLD = 8
+
+# Documento abierto una vez por proceso worker (vía initializer del pool):
+# así los bytes del PDF viajan una sola vez a cada worker en lugar de
+# serializarse de nuevo con cada página
+_WORKER_PDF = None
+
+def _init_pdf_worker(pdf_bytes):
+    global _WORKER_PDF
+    _WORKER_PDF = pdfium.PdfDocument(pdf_bytes)
+
+def _extract_pdf_page(page_index):
+    """
+    Worker del pool: extrae el texto de una página del documento abierto
+    en _init_pdf_worker. Debe estar a nivel de módulo para ser
+    serializable entre procesos.
+    """
+    return _WORKER_PDF[page_index].get_textpage().get_text_range()
+
+def iter_pdf_pages(file):
+    """
+    Generador que extrae el texto de un PDF página a página con pypdfium2
+    (backend C de PDFium, mucho más rápido que extraer en Python puro).
+    En documentos grandes reparte las páginas entre procesos; ex.map
+    devuelve los resultados en orden a medida que se completan, así el
+    consumidor puede ir codificando sin esperar al documento entero.
     """
-    return hashlib.sha256(file.getvalue()).hexdigest()
+    file.seek(0)
+    pdf_bytes = file.read()
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    n_pages = len(pdf)
+    if n_pages >= PDF_PARALLEL_THRESHOLD:
+        pdf.close()
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(), initializer=_init_pdf_worker, initargs=(pdf_bytes,)
+        ) as ex:
+            for i, content in enumerate(ex.map(_extract_pdf_page, range(n_pages))):
+                if content:
+                    yield f"\n[Fuente: {file.name} - Página {i+1}]\n{content}"
+    else:
+        try:
+            for i, page in enumerate(pdf):
+                content = page.get_textpage().get_text_range()
+                if content:
+                    yield f"\n[Fuente: {file.name} - Página {i+1}]\n{content}"
+        finally:
+            pdf.close()
 
 def extract_text_from_file(file):
     """
     Función polimórfica que extrae el contenido textual de diversos formatos.
-    Soporta: .pdf, .docx, .txt, .html, .csv y .xlsx.
+    Soporta: .docx, .txt, .html, .csv y .xlsx. (Los PDF van por el
+    generador iter_pdf_pages, integrados en el pipeline en streaming.)
     """
     file_extension = file.name.split('.')[-1].lower()
     text = ""
 
-    # Caso PDF: Extrae texto página por página
-    if file_extension == "pdf":
-        reader = PdfReader(file)
-        for i, page in enumerate(reader.pages):
-            content = page.extract_text()
-            if content: 
-                text += f"\n[Fuente: {file.name} - Página {i+1}]\n{content}"
-            
     # Caso Word: Itera sobre los párrafos del documento
-    elif file_extension == "docx":
+    if file_extension == "docx":
         doc = Document(file)
         text = "\n".join([para.text for para in doc.paragraphs])
         
@@ -64,21 +173,32 @@ def extract_text_from_file(file):
     elif file_extension == "txt":
         text = file.read().decode("utf-8")
         
-    # Caso HTML: Limpia etiquetas y extrae solo el texto visible
+    # Caso HTML: Limpia etiquetas y extrae solo el texto visible.
+    # Preferimos selectolax (parser en C); BeautifulSoup queda de respaldo.
     elif file_extension == "html":
-        soup = BeautifulSoup(file.read(), "html.parser")
-        text = soup.get_text(separator="\n")
+        html_bytes = file.read()
+        if HTMLParser is not None:
+            tree = HTMLParser(html_bytes)
+            body = tree.body if tree.body is not None else tree.root
+            text = body.text(separator="\n") if body is not None else ""
+        else:
+            soup = BeautifulSoup(html_bytes, "html.parser")
+            text = soup.get_text(separator="\n")
         
-    # Caso xlsx
+    # Caso xlsx: serializamos como CSV, no con to_string(): es mucho más
+    # rápido (ruta C de pandas) y el texto sin padding de columnas da
+    # mejores embeddings
     elif file_extension == "xlsx":
         df = pd.read_excel(file)
-        text = df.to_string()
+        text = df.to_csv(index=False)
 
     elif file_extension == "csv":
-        # 1. Leemos una muestra del archivo para detectar el separador
-        sample = file.read(2048).decode("utf-8")
-        file.seek(0) # "Rebobinamos" el archivo para que pandas lo lea desde el inicio
-        
+        # 1. Leemos el archivo UNA sola vez y trabajamos sobre los bytes
+        # cacheados: la muestra para el Sniffer y los dos intentos de
+        # pandas salen del mismo buffer, sin relecturas.
+        raw = file.read()
+        sample = raw[:4096].decode("utf-8", errors="replace")
+
         try:
             # 2. Usamos el Sniffer de la librería csv para identificar el delimitador
             dialect = csv.Sniffer().sniff(sample)
@@ -89,103 +209,267 @@ def extract_text_from_file(file):
 
         # 4. Leemos con Pandas usando el separador automático
         try:
-            df = pd.read_csv(file, sep=separador_detectado, encoding='utf-8')
+            df = pd.read_csv(io.BytesIO(raw), sep=separador_detectado, encoding='utf-8', engine='c')
         except:
-            file.seek(0)
-            df = pd.read_csv(file, sep=separador_detectado, encoding='latin-1')
-            
-        text = df.to_string()
+            df = pd.read_csv(io.BytesIO(raw), sep=separador_detectado, encoding='latin-1', engine='c')
+
+        # Igual que en xlsx: CSV plano en vez de tabla pretty-printed
+        text = df.to_csv(index=False)
 
     return text
 
-def chunk_text(text):
+def iter_chunks(pieces):
     """
     Divide textos largos en fragmentos más pequeños (chunks).
-    Esto es necesario porque los modelos de embedding y la IA tienen límites de tokens.
+    Fragmenta por TOKENS con el tokenizer del propio modelo, no por
+    caracteres: así cada chunk llena exactamente la ventana del MiniLM
+    (256 tokens) y nada se trunca en silencio dentro del transformer.
+    El contenido de cada chunk se recorta del texto ORIGINAL usando los
+    offsets del tokenizer; decodificar ids con un tokenizer uncased
+    devolvería texto en minúsculas, sin tildes y con [UNK], y eso es lo
+    que acabaría almacenado, mostrado al usuario y enviado a Gemini.
+    Generador: consume un iterable de trozos de texto (p. ej. páginas de
+    PDF) y va emitiendo tuplas (contenido, inicio_en_tokens, tamaño)
+    sin materializar el documento completo en memoria.
     """
-    chunk_size = 800   # Caracteres por fragmento
-    overlap = 160      # Caracteres que se repiten para no perder contexto entre cortes
-    chunks = []
-    start = 0
-    chunk_id = 0
-
-    while start < len(text):
-        chunk_content = text[start:start + chunk_size]
-        chunks.append({
-            "id": f"chunk_{chunk_id}",
-            "content": chunk_content,
-            "start_index": start,
-            "size": len(chunk_content)
-        })
-        chunk_id += 1
-        start += chunk_size - overlap
-    return chunks
+    # Copia propia del tokenizer: este generador corre en el hilo
+    # productor mientras el hilo principal llama a EMBEDDING_MODEL.encode,
+    # y los fast-tokenizers de HF no admiten uso concurrente (el famoso
+    # RuntimeError "Already borrowed", además de que encode() les cambia
+    # el estado de padding/truncation a mitad de camino)
+    tok = copy.deepcopy(EMBEDDING_MODEL.tokenizer)
+    window = EMBEDDING_MODEL.get_max_seq_length() or 256  # Tokens por fragmento
+    overlap = 64       # Tokens que se repiten para no perder contexto entre cortes
+    step = window - overlap
+
+    buf_text = ""  # Texto original pendiente de fragmentar
+    offsets = []   # (inicio, fin) en caracteres de cada token, relativos a buf_text
+    pos = 0        # Índice (en offsets) del primer token de la próxima ventana
+    base = 0       # Offset global (en tokens) del primer token de la próxima ventana
+    for piece in pieces:
+        enc = tok(piece, add_special_tokens=False, return_offsets_mapping=True)
+        shift = len(buf_text)
+        offsets.extend((s + shift, e + shift) for s, e in enc["offset_mapping"])
+        buf_text += piece
+        # Avanzamos un cursor entero sobre el buffer en vez de recortarlo
+        # en cada ventana: recortar aquí sería O(n²) cuando el documento
+        # llega como una sola pieza (todos los formatos que no son PDF)
+        while len(offsets) - pos >= window:
+            content = buf_text[offsets[pos][0]:offsets[pos + window - 1][1]]
+            yield content, base, len(content)
+            pos += step
+            base += step
+        # Recorte solo entre piezas, donde lo pendiente está acotado por
+        # una ventana de tokens
+        if pos:
+            cut = offsets[pos][0] if pos < len(offsets) else len(buf_text)
+            buf_text = buf_text[cut:]
+            offsets = [(s - cut, e - cut) for s, e in offsets[pos:]]
+            pos = 0
+    # Resto final: puede quedar más de un chunk corto por el solape
+    while pos < len(offsets):
+        last = min(pos + window, len(offsets)) - 1
+        content = buf_text[offsets[pos][0]:offsets[last][1]]
+        yield content, base, len(content)
+        pos += step
+        base += step
 
 # ============================================================
 # FUNCIONES DE BASE DE DATOS Y RAG (VECTOR DB)
 # ============================================================
 
-def create_chroma_collection(chunks):
+def collection_name_for(file_hash):
+    """Nombre de colección determinista a partir del hash del archivo."""
+    return f"doc_{file_hash[:16]}"
+
+# Chunks por mini-lote del pipeline: mientras el modelo codifica un lote,
+# el hilo productor extrae y fragmenta el siguiente
+ENCODE_MINI_BATCH = 64
+
+def _encode_chunk_batch(texts):
     """
-    Toma los fragmentos de texto, genera sus vectores (embeddings) 
-    y los guarda en la base de datos ChromaDB.
+    Codifica un mini-lote de chunks con "smart batching": ordenados por
+    longitud para minimizar el padding del transformer, deshaciendo el
+    orden sobre la matriz resultante. Normalizamos aquí para no hacer
+    conversiones extra en Python.
     """
-    # Borramos la colección previa para evitar mezclar documentos distintos
-    try:
-        client.delete_collection("doc_rag")
-    except:
-        pass
-
-    collection = client.create_collection(name="doc_rag")
-    
-    # Preparamos los datos para insertar
-    texts = [c["content"] for c in chunks]
-    ids = [c["id"] for c in chunks]
-    metadatas = [{"chunk_index": i, "start_index": c["start_index"], "chunk_size": c["size"]} for i, c in enumerate(chunks)]
-    
-    # Generamos los vectores numéricos
-    embeddings = EMBEDDING_MODEL.encode(texts)
-    
-    # Guardamos todo en la base de datos
-    collection.add(
-        documents=texts,
-        embeddings=embeddings.tolist(),
-        ids=ids,
-        metadatas=metadatas
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    embeddings = EMBEDDING_MODEL.encode(
+        [texts[i] for i in order],
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    embeddings = embeddings[np.argsort(order)]
+    # Matriz float32 contigua (SoA): el fancy indexing ya copia y el
+    # modelo en GPU devuelve fp16, así que fijamos el dtype explícito
+    # para que Chroma pueda volcarla directo al índice sin conversión
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+def create_chroma_collection(pieces, file_hash):
+    """
+    Pipeline en streaming: un hilo productor fragmenta el texto a medida
+    que llega (páginas de PDF incluidas) y el hilo principal codifica e
+    inserta cada mini-lote en ChromaDB. Así la extracción se solapa con
+    el encode y nunca se materializa el documento entero más la matriz
+    de embeddings a la vez. Devuelve (colección, nº de chunks).
+    """
+    # Construimos bajo un nombre temporal y solo renombramos al nombre
+    # definitivo al terminar: como los mini-lotes se insertan
+    # incrementalmente, un proceso que muera a mitad dejaría una
+    # colección truncada que la comprobación de reutilización tomaría
+    # por buena. Borramos restos de intentos anteriores y la versión previa.
+    name = collection_name_for(file_hash)
+    build_name = f"building_{file_hash[:16]}"
+    for stale in (name, build_name):
+        try:
+            client.delete_collection(stale)
+        except:
+            pass
+
+    # Parámetros HNSW afinados: coseno (los vectores ya van normalizados)
+    # y ef de construcción moderado para inserciones más rápidas
+    collection = client.create_collection(
+        name=build_name,
+        metadata={"hnsw:space": "cosine", "hnsw:construction_ef": 80, "hnsw:M": 16},
     )
-    return collection
+
+    # Cola acotada entre productor (extraer + fragmentar) y consumidor
+    # (codificar + insertar); el centinela marca el final. Si el
+    # consumidor aborta (fallo del encode o de Chroma), el evento evita
+    # que el productor quede bloqueado para siempre en put() contra la
+    # cola llena, reteniendo su hilo y el pool de procesos del PDF.
+    batches = queue.Queue(maxsize=8)
+    _DONE = object()
+    cancelled = threading.Event()
+
+    def producer():
+        def send(item):
+            while not cancelled.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            try:
+                batch = []
+                for chunk in iter_chunks(pieces):
+                    batch.append(chunk)
+                    if len(batch) == ENCODE_MINI_BATCH:
+                        if not send(batch):
+                            return
+                        batch = []
+                if batch and not send(batch):
+                    return
+                send(_DONE)
+            except BaseException as exc:
+                send(exc)
+        finally:
+            # Cierra el generador si quedó a medias para que
+            # iter_pdf_pages libere su ProcessPoolExecutor
+            if hasattr(pieces, "close"):
+                pieces.close()
+
+    threading.Thread(target=producer, daemon=True).start()
+
+    total = 0
+    try:
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            texts = [content for content, _, _ in batch]
+            embeddings = _encode_chunk_batch(texts)
+            # Chroma acepta el ndarray directo, sin pasar por .tolist()
+            collection.add(
+                documents=texts,
+                embeddings=embeddings,
+                ids=[f"chunk_{total + i}" for i in range(len(batch))],
+                metadatas=[
+                    {"chunk_index": total + i, "start_index": int(start), "chunk_size": int(size)}
+                    for i, (_, start, size) in enumerate(batch)
+                ],
+            )
+            total += len(batch)
+    except BaseException:
+        cancelled.set()
+        raise
+
+    # "Publicamos" la colección: solo existe bajo el nombre definitivo
+    # si el indexado llegó hasta el final
+    collection.modify(name=name)
+    return collection, total
+
+@st.cache_resource
+def get_query_encoder():
+    """
+    Construye (una sola vez por proceso) el codificador de preguntas:
+    batcher dinámico por debajo y memoización lru_cache por encima.
+    Todo tiene que vivir tras st.cache_resource: a nivel de módulo, cada
+    rerun de Streamlit —y cada clic del botón ES un rerun— recrearía el
+    lru_cache vacío y un batcher nuevo por sesión, de modo que los
+    usuarios concurrentes nunca compartirían forward y cada rerun
+    filtraría un hilo de BatchProcessor.
+    """
+    model = get_embedder()
+
+    def encode_batch(queries):
+        # Normalizadas como los chunks, para que la distancia coseno del
+        # índice trabaje sobre vectores unitarios coherentes
+        return list(model.encode(queries, convert_to_numpy=True, normalize_embeddings=True))
+
+    # Con varios usuarios simultáneos, el decorador de 'batched' agrupa
+    # las peticiones que llegan en una ventana de 20 ms en un solo
+    # forward del modelo en vez de N pasadas de tamaño 1
+    if batched is not None:
+        encode_batch = batched.dynamically(batch_size=32, timeout_ms=20)(encode_batch)
+
+    @functools.lru_cache(maxsize=256)
+    def encode_query(query):
+        # Memoizado: si el usuario repite la misma pregunta (o pulsa el
+        # botón dos veces) no se paga otro forward del modelo
+        return encode_batch([query])[0]
+
+    return encode_query
 
 def retrieve_context(collection, query, k=4):
     """
-    Busca en la base de datos los 'k' fragmentos que más se parecen 
+    Busca en la base de datos los 'k' fragmentos que más se parecen
     semánticamente a la pregunta del usuario.
     """
-    query_embedding = EMBEDDING_MODEL.encode([query])
-    return collection.query(query_embeddings=query_embedding.tolist(), n_results=k)
+    # Chroma acepta el ndarray (1, 384) directo, sin pasar por .tolist()
+    query_embedding = np.asarray(get_query_encoder()(query))[None, :]
+    return collection.query(query_embeddings=query_embedding, n_results=k)
 
 # ============================================================
 # FUNCIÓN DE INTELIGENCIA ARTIFICIAL
 # ============================================================
 
+# El preámbulo de sistema se fija UNA vez en el modelo: cada pregunta
+# solo envía contexto + pregunta, con menos tokens de entrada por llamada
+@st.cache_resource
+def get_gemini():
+    return genai.GenerativeModel(
+        "models/gemini-2.5-flash-lite",
+        system_instruction=(
+            "Eres un asistente que responde SOLO con la información del contexto. "
+            'Si la respuesta no está en el contexto, di: "No se encuentra en el documento".'
+        ),
+    )
+
 def ask_gemini(context, question):
     """
     Envía el contexto recuperado y la pregunta a Google Gemini.
-    Usa un prompt de sistema para asegurar que no invente información.
+    El prompt de sistema que evita que invente información ya viene
+    precompilado en el modelo.
     """
-    model = genai.GenerativeModel("models/gemini-2.5-flash-lite")
-    
-    prompt = f"""
-    Eres un asistente que responde SOLO con la información del contexto.
-    Si la respuesta no está en el contexto, di: "No se encuentra en el documento".
-
-    CONTEXTO:
-    {context}
-
-    PREGUNTA:
-    {question}
-    """
-    
-    response = model.generate_content(prompt)
+    response = get_gemini().generate_content(f"CONTEXTO:\n{context}\n\nPREGUNTA:\n{question}")
     return response.text
 
 # ============================================================
@@ -217,18 +501,37 @@ if uploaded_file:
 # Botón para disparar el procesamiento
 if uploaded_file and not st.session_state.file_processed:
     if st.button("📥 Procesar e Indexar Contenido"):
-        with st.spinner(f"Analizando {uploaded_file.name}..."):
-            # 1. Extraer
-            text = extract_text_from_file(uploaded_file)
-            if text.strip():
-                # 2. Fragmentar
-                chunks = chunk_text(text)
-                # 3. Vectorizar y Guardar
-                st.session_state.collection = create_chroma_collection(chunks)
-                st.session_state.file_processed = True
-                st.success(f"¡Listo! Se han indexado {len(chunks)} fragmentos.")
-            else:
-                st.error("El archivo parece estar vacío o no tiene texto extraíble.")
+        # 0. Si este archivo ya fue indexado antes (misma huella), la
+        # colección persistida sigue en disco: la reutilizamos y nos
+        # ahorramos extraer, fragmentar y vectorizar de nuevo.
+        existing = None
+        try:
+            existing = client.get_collection(collection_name_for(st.session_state.file_hash))
+        except Exception:
+            pass
+        if existing is not None and existing.count() > 0:
+            st.session_state.collection = existing
+            st.session_state.file_processed = True
+            st.success(f"¡Listo! Documento ya indexado ({existing.count()} fragmentos reutilizados).")
+        else:
+            with st.spinner(f"Analizando {uploaded_file.name}..."):
+                # 1. Fuente de texto: los PDF llegan como generador de
+                # páginas; el resto de formatos como un único bloque
+                if uploaded_file.name.split('.')[-1].lower() == "pdf":
+                    pieces = iter_pdf_pages(uploaded_file)
+                else:
+                    text = extract_text_from_file(uploaded_file)
+                    pieces = [text] if text.strip() else []
+                # 2. Fragmentar + Vectorizar + Guardar en streaming
+                collection, n_chunks = create_chroma_collection(
+                    pieces, st.session_state.file_hash
+                )
+                if n_chunks:
+                    st.session_state.collection = collection
+                    st.session_state.file_processed = True
+                    st.success(f"¡Listo! Se han indexado {n_chunks} fragmentos.")
+                else:
+                    st.error("El archivo parece estar vacío o no tiene texto extraíble.")
 
 # ------------------------------
 # SECCIÓN DE PREGUNTAS (Con tu visualización original)
@@ -260,7 +563,7 @@ if st.session_state.file_processed and st.session_state.collection:
             ):
                 st.markdown(f"""
 **Chunk #{meta['chunk_index']}**
-- 📍 Inicio en texto: `{meta['start_index']}`
+- 📍 Inicio en texto (tokens): `{meta['start_index']}`
 - 📏 Tamaño: `{meta['chunk_size']}` caracteres
 
 ```text